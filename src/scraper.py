@@ -1,14 +1,14 @@
-from typing import List, Tuple, Union
+from typing import List, Tuple
 import requests
 import traceback
 from datetime import datetime
 import time
 import math
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from lxml import etree, html
-from bs4 import BeautifulSoup, Tag, NavigableString, Comment
-import regex as re
+import re
 
 from src.custom_logger import get_logger, CustomFilter
 from src.config import sort_by_enum, review_default_result, metadata_default
@@ -17,18 +17,37 @@ default_hl = "pt-br"
 default_request_interval = 0.2
 default_n_retries = 10
 default_retry_time = 30
-
-Path("examples/").mkdir(exist_ok=True)
-Path("errors/").mkdir(exist_ok=True)
+default_timeout = 10
+
+_WS_RE = re.compile(r"\s+")
+_WS1_RE = re.compile(r"\s")
+_QUOTES_RE = re.compile(r"['\"]")
+_QUOTES_TABLE = str.maketrans("", "", "'\"")
+_FEATURE_ID_RE = re.compile(r"0[xX][0-9a-fA-F]+:0[xX][0-9a-fA-F]+")
+_N_REVIEWS_RE = re.compile(r"[.]|,| reviews| comentários")
+_POSTID_RE = re.compile(r"[?&]postId=([^&]+)")
+_RATING_RE = re.compile(r"[0-9]+[.][0-9]*")
+_USER_REVIEWS_RE = re.compile(r"([Uuma0-9.,]+) (?:comentário|review)")
+_USER_PHOTOS_RE = re.compile(r"([Uuma0-9.,]+) (?:foto|photo)")
+_PLACE_NAME_RE = re.compile(r"/place/([^/]+)/")
+_TOKEN_RE = re.compile(r'(data-next-page-token\s*=\s*")([\w=]*)')
+
+_REVIEWS_XPATH = etree.XPath("/html/body/div[1]/div/div[2]/div[4]/div/div[2]/div")
+_EXPANDABLE_SECTION_XPATH = etree.XPath(".//*[@data-expandable-section]")
+_LIKES_XPATH = etree.XPath(".//*[@jsname='CMh1ye']")
+_TOPICS_XPATH = etree.XPath("//localreviews-place-topics")
 
 
 class GoogleMapsAPIScraper:
+    _errors_dir_created = False
+
     def __init__(
         self,
         hl: str = default_hl,
         request_interval: float = default_request_interval,
         n_retries: int = default_n_retries,
         retry_time: float = default_retry_time,
+        timeout: float = default_timeout,
         logger=None,
     ):
         if not logger is None:
@@ -39,13 +58,21 @@ class GoogleMapsAPIScraper:
         self.request_interval = request_interval
         self.n_retries = n_retries
         self.retry_time = retry_time
+        self.timeout = timeout
+        self.seen_errors = set()
         self._reset_logger_filter()
 
+        # Reuse connections to google between requests
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("https://", adapter)
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, tb):
         self._reset_logger_filter()
+        self.session.close()
         if exc_type is not None:
             traceback.print_exception(exc_type, exc_value, tb)
             self.logger.exception(exc_value)
@@ -56,27 +83,51 @@ class GoogleMapsAPIScraper:
         [self.logger.removeFilter(f) for f in self.logger.filters]
         self.logger.addFilter(CustomFilter(url_name))
 
+    def _make_errors_dir(self):
+        """Creates errors folder once, only when an error file is first saved"""
+        if not type(self)._errors_dir_created:
+            Path("errors/").mkdir(exist_ok=True)
+            type(self)._errors_dir_created = True
+
     def _ts(self) -> str:
         """Returns timestamp formatted as string safe for file naming"""
         return datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")
 
     def _parse_url_to_feature_id(self, url: str) -> str:
-        return re.findall("0[xX][0-9a-fA-F]+:0[xX][0-9a-fA-F]+", url)[0]
+        """Finds feature_id after the "!1s" url delimiter, falling back to regex"""
+        tail = url.partition("!1s")[2]
+        if tail:
+            feature_id = tail.split("?", 1)[0].split("!", 1)[0]
+            if ":" in feature_id and feature_id.startswith("0x"):
+                return feature_id
+        return _FEATURE_ID_RE.findall(url)[0]
 
     def _parse_sort_by(self, sort_by: str) -> int:
         """Default to newest"""
         return sort_by_enum.get(sort_by, 1)
 
     def _decode_response(self, response) -> str:
-        """Decodes response bytes in unicode escape encoding"""
+        """Decodes response bytes in its charset, then its \\xNN escape sequences"""
+        encoding = response.encoding or "utf-8"
         try:
-            response_text = response.content.decode(encoding="unicode_escape")
+            response_text = response.content.decode(encoding=encoding)
         except UnicodeDecodeError as e:
-            tb = re.sub("\s", " ", traceback.format_exc())
-            self.logger.info(f"UnicodeDecodeError. Replacing errors. {tb}")
-            response_text = response.content.decode(
-                encoding="unicode_escape", errors="replace"
+            tb = _WS1_RE.sub(" ", traceback.format_exc())
+            self.logger.info(f"UnicodeDecodeError in {encoding}. Using latin-1. {tb}")
+            response_text = response.content.decode(encoding="latin-1")
+        if "\\" in response_text:
+            # Non latin-1 characters become escapes too, so they survive the decode
+            escaped = response_text.encode(
+                encoding="latin-1", errors="backslashreplace"
             )
+            try:
+                response_text = escaped.decode(encoding="unicode_escape")
+            except UnicodeDecodeError as e:
+                tb = _WS1_RE.sub(" ", traceback.format_exc())
+                self.logger.info(f"UnicodeDecodeError. Replacing errors. {tb}")
+                response_text = escaped.decode(
+                    encoding="unicode_escape", errors="replace"
+                )
         if response_text is None or response_text == "":
             raise Exception(
                 "Response text is none. Try request again."
@@ -90,9 +141,9 @@ class GoogleMapsAPIScraper:
         if idx_first_div == -1:
             self.logger.info("first div not found")
             idx_first_div = 0
-        match = re.search("</div", text, flags=re.REVERSE)
-        if match:
-            idx_last_div = match.span()[1] + 1
+        idx_last_div = text.rfind("</div>")
+        if idx_last_div != -1:
+            idx_last_div += len("</div>")
         else:
             self.logger.info("last div not found")
             idx_last_div = -1
@@ -100,11 +151,10 @@ class GoogleMapsAPIScraper:
         return "<html><body>" + text + "</body></html>"
 
     def _format_response_text(self, response_text: str):
-        """Transforms text into soup and extract list of reviews"""
-        response_soup = reviews_soup = review_count = next_token = None
+        """Transforms text into tree and extract list of reviews"""
+        tree = reviews = review_count = next_token = None
         try:
-            # Send page to soup and trees
-            response_soup = BeautifulSoup(response_text, "lxml")
+            # Send page to tree
             tree = html.document_fromstring(response_text)
 
             # Encontrando número de reviews e token de próxima página
@@ -113,51 +163,52 @@ class GoogleMapsAPIScraper:
             next_token = metadata_node.attrib["data-next-page-token"]
 
             # Iterando sobre texto de cada review
-            reviews_tree = tree.xpath(
-                "/html/body/div[1]/div/div[2]/div[4]/div/div[2]/div"
-            )
-            reviews_soup = [
-                response_soup.find("div", dict(r.attrib)) for r in reviews_tree
-            ]
+            reviews = _REVIEWS_XPATH(tree)
         except Exception as e:
-            tb = re.sub("\s", " ", traceback.format_exc())
+            tb = _WS1_RE.sub(" ", traceback.format_exc())
             self.logger.info(f"Response formatting error: {tb}")
             if next_token is None:
                 next_token = self._get_response_token(response_text)
 
-        return response_text, response_soup, reviews_soup, review_count, next_token
+        return response_text, tree, reviews, review_count, next_token
 
     def _get_response_token(self, response_text: str) -> str:
         """Searches for token in response text using regex, in case other methods fail"""
-        match = re.search('(data-next-page-token\s*=\s*")([\w=]*)', response_text)
+        match = _TOKEN_RE.search(response_text)
         if match:
             return match.groups()[1]
         self.logger.info("regex token not found")
 
-    def _get_request(
+    def _get_query_base(
         self,
         feature_id: str,
         async_: str = "",
         hl: str = "",
         sort_by_id: int = "",
         associated_topic: str = "",
-        token: str = "",
-    ) -> Tuple[BeautifulSoup, List[BeautifulSoup], int, str]:
-        """Makes and formats get request in google's api"""
+    ) -> str:
+        """Makes google's api query, missing only the next page token at the end"""
         if not hl:
             hl = self.hl
-        query = (
+        return (
             "https://www.google.com/async/reviewDialog?"
             f"hl={hl}&"
             f"async={async_}"
             f"feature_id:{feature_id},"
             f"sort_by:{sort_by_id},"
-            f"next_page_token:{token},"
             f"associated_topic:{associated_topic},"
-            f"_fmt:pc"
+            f"_fmt:pc,"
+            f"next_page_token:"
         )
+
+    def _get_request(
+        self,
+        query_base: str,
+        token: str = "",
+    ) -> Tuple[str, html.HtmlElement, List[html.HtmlElement], int, str]:
+        """Makes and formats get request in google's api"""
         # Make request
-        response = requests.get(query)
+        response = self.session.get(query_base + token, timeout=self.timeout)
         response.raise_for_status()
 
         # Decode response
@@ -171,28 +222,30 @@ class GoogleMapsAPIScraper:
 
     def _parse_place(
         self,
-        response: BeautifulSoup,
+        tree: html.HtmlElement,
+        retrieval_date: str,
     ) -> dict:
         """Parse place html"""
         metadata = metadata_default.copy()
 
         # Parse place_name
         try:
-            metadata["place_name"] = response.find(True, class_="P5Bobd").text
+            metadata["place_name"] = self._find_class(tree, "P5Bobd").text_content()
         except Exception as e:
             self.logger.error("error parsing place: place_name")
             self.logger.exception(e)
 
         # Parse address
         try:
-            metadata["address"] = response.find(True, class_="T6pBCe").text
+            metadata["address"] = self._find_class(tree, "T6pBCe").text_content()
         except Exception as e:
             self.logger.error("error parsing place: address")
             self.logger.exception(e)
 
         # Parse overall_rating
         try:
-            rating_text = response.find(True, class_="Aq14fc").text.replace(",", ".")
+            rating_text = self._find_class(tree, "Aq14fc").text_content()
+            rating_text = rating_text.replace(",", ".")
             metadata["overall_rating"] = float(rating_text)
         except Exception as e:
             self.logger.error("error parsing place: overall_rating")
@@ -200,8 +253,8 @@ class GoogleMapsAPIScraper:
 
         # Parse n_reviews
         try:
-            n_reviews_text = response.find(True, class_="z5jxId").text
-            n_reviews_text = re.sub("[.]|,| reviews| comentários", "", n_reviews_text)
+            n_reviews_text = self._find_class(tree, "z5jxId").text_content()
+            n_reviews_text = _N_REVIEWS_RE.sub("", n_reviews_text)
             metadata["n_reviews"] = int(n_reviews_text)
         except Exception as e:
             self.logger.error("error parsing place: n_reviews")
@@ -209,81 +262,101 @@ class GoogleMapsAPIScraper:
 
         # Parse topics
         try:
-            topics = response.find("localreviews-place-topics")
-            s = " ".join([s for s in topics.stripped_strings])
-            metadata["topics"] = re.sub("\s+", " ", s)
+            topics = _TOPICS_XPATH(tree)[0]
+            metadata["topics"] = self._join_text(topics)
         except Exception as e:
             self.logger.error("error parsing place: topics")
             self.logger.exception(e)
 
-        metadata["retrieval_date"] = str(datetime.now())
+        metadata["retrieval_date"] = retrieval_date
 
         return metadata
 
-    def _parse_review_text(self, text_block) -> str:
+    def _find_class(self, node: html.HtmlElement, class_name: str):
+        """Returns first element with class name inside node, or None"""
+        nodes = node.find_class(class_name)
+        return nodes[0] if nodes else None
+
+    def _first(self, nodes: list):
+        """Returns first element of xpath result, or None"""
+        return nodes[0] if nodes else None
+
+    def _join_text(self, node: html.HtmlElement) -> str:
+        """Joins all strings inside node separated by single spaces"""
+        return _WS_RE.sub(" ", " ".join(node.itertext())).strip()
+
+    def _parse_review_text(self, text_block: html.HtmlElement) -> str:
         """Parse review text html, removing unwanted characters"""
-        text = ""
-        for e, s in zip(text_block.contents, text_block.stripped_strings):
-            if isinstance(e, Tag) and e.has_attr(
-                "class"
-            ):  #  and e.attrs["class"] in ["review-snippet","k8MTF",]:
+        parts = [text_block.text or ""]
+        for e in text_block:
+            if not isinstance(e, html.HtmlElement):
+                # Comments only contribute their tail text
+                parts.append(e.tail or "")
+                continue
+            if "class" in e.attrib:
+                # Stop at first child with class, like "review-snippet" or "k8MTF"
                 break
-            text += s + " "
+            parts.extend(e.itertext())
+            parts.append(e.tail or "")
+        text = " ".join(parts)
 
-        text = re.sub("\s", " ", text)
-        text = re.sub("'|\"", "", text)
-        text = text.strip()
-        return text
+        return _WS_RE.sub(" ", text.translate(_QUOTES_TABLE)).strip()
 
     def _handle_review_exception(self, result, review, name) -> dict:
         # Error log
-        tb = re.sub("\s", " ", traceback.format_exc())
+        tb = _WS1_RE.sub(" ", traceback.format_exc())
         msg = f"review {name}: {tb}"
         self.logger.error(msg)
         # Appending to line
-        tb = re.sub("['\"]", " ", tb)
+        tb = _QUOTES_RE.sub(" ", tb)
         result["errors"].append(tb)
-        # Saving file
+        # Saving file only once for each distinct error
+        if msg in self.seen_errors:
+            return result
+        self.seen_errors.add(msg)
+        self._make_errors_dir()
         with open(
             f"errors/review_{name}_{self._ts()}.html", "w", encoding="utf-8"
         ) as f:
-            f.writelines(str(review) + "\n\n" + msg)
+            f.writelines(html.tostring(review, encoding="unicode") + "\n\n" + msg)
         return result
 
     def _handle_place_exception(self, response_text, name, n) -> dict:
         # Error log
-        tb = re.sub("\s", " ", traceback.format_exc())
+        tb = _WS1_RE.sub(" ", traceback.format_exc())
         msg = f"place {name} request {n}: {tb}"
         self.logger.error(msg)
         # Saving file
+        self._make_errors_dir()
         with open(
             f"errors/place_{name}_request_{n}_{self._ts()}.html", "w", encoding="utf-8"
         ) as f:
             f.writelines(str(response_text) + "\n\n" + msg)
 
-    def _parse_review(self, review: Tag) -> dict:
-        result = review_default_result.copy()
+    def _parse_review(self, review: html.HtmlElement, retrieval_date: str) -> dict:
+        # New errors list, so reviews don't share the default's list
+        result = dict(review_default_result, errors=[])
 
-        # Make timestamp
-        result["retrieval_date"] = str(datetime.now())
+        # Timestamp shared by all reviews in the page
+        result["retrieval_date"] = retrieval_date
 
         # Parse text
         try:
             # Find text block
-            text_block = review.find(True, class_="review-full-text")
-            if not text_block:
-                text_block = review.find(True, {"data-expandable-section": True})
+            text_block = self._find_class(review, "review-full-text")
+            if text_block is None:
+                text_block = self._first(_EXPANDABLE_SECTION_XPATH(review))
             # Extract text
-            if text_block:
+            if text_block is not None:
                 result["text"] = self._parse_review_text(text_block)
         except Exception as e:
             self._handle_review_exception(result, review, "text")
 
         # Parse review rating
         try:
-            rating_text = review.find(True, class_="lTi8oc z3HNkc").get("aria-label")
-            rating_text = re.sub(",", ".", rating_text)
-            rating = re.findall("[0-9]+[.][0-9]*", rating_text)
+            rating_text = self._find_class(review, "lTi8oc z3HNkc").get("aria-label")
+            rating_text = rating_text.replace(",", ".")
+            rating = _RATING_RE.findall(rating_text)
             result["rating"] = float(rating[0])
             result["rating_max"] = float(rating[1])
         except Exception as e:
@@ -291,37 +364,36 @@ class GoogleMapsAPIScraper:
 
         # Parse other ratings
         try:
-            other_ratings = review.find(True, class_="k8MTF")
-            if other_ratings:
-                s = " ".join([s for s in other_ratings.stripped_strings])
-                result["other_ratings"] = re.sub("\s+", " ", s)
+            other_ratings = self._find_class(review, "k8MTF")
+            if other_ratings is not None:
+                result["other_ratings"] = self._join_text(other_ratings)
         except Exception as e:
             self._handle_review_exception(result, review, "other_ratings")
 
         # Parse relative date
         try:
-            result["relative_date"] = review.find(True, class_="dehysf lTi8oc").text
+            relative_date = self._find_class(review, "dehysf lTi8oc")
+            result["relative_date"] = relative_date.text_content()
         except Exception as e:
             self._handle_review_exception(result, review, "relative_date")
 
         # Parse user name
         try:
-            result["user_name"] = review.find(True, class_="TSUbDb").text
+            result["user_name"] = self._find_class(review, "TSUbDb").text_content()
         except Exception as e:
             self._handle_review_exception(result, review, "user_name")
 
         # Parse user metadata
         try:
-            user_node = review.find(True, class_="Msppse")
-            if user_node:
+            user_node = self._find_class(review, "Msppse")
+            if user_node is not None:
                 result["user_url"] = user_node.get("href")
                 result["user_is_local_guide"] = (
-                    True if user_node.find(True, class_="QV3IV") else False
-                )
-                user_reviews = re.findall(
-                    "[Uuma0-9.,]+(?= comentário| review)", user_node.text
+                    self._find_class(user_node, "QV3IV") is not None
                 )
-                user_photos = re.findall("[Uuma0-9.,]+(?= foto| photo)", user_node.text)
+                user_text = user_node.text_content()
+                user_reviews = _USER_REVIEWS_RE.findall(user_text)
+                user_photos = _USER_PHOTOS_RE.findall(user_text)
                 if len(user_reviews) > 0:
                     result["user_reviews"] = user_reviews[0]
                 if len(user_photos) > 0:
@@ -331,42 +403,79 @@ class GoogleMapsAPIScraper:
 
         # Parse review id
         try:
-            # result["review_id"] = review.find(True, {"data-ri": True}).get("data-ri")
-            review_id = review.find(True, class_="RvU3D").get("href")
-            result["review_id"] = re.findall("(?<=postId=).*?(?=&)", review_id)[0]
+            # result["review_id"] = review.xpath(".//*[@data-ri]")[0].get("data-ri")
+            review_id = self._find_class(review, "RvU3D").get("href")
+            result["review_id"] = _POSTID_RE.search(review_id).group(1)
         except Exception as e:
             self._handle_review_exception(result, review, "review_id")
 
         # Parse review likes
         try:
-            review_likes = review.find(True, jsname="CMh1ye")
-            if review_likes:
-                result["likes"] = int(review_likes.text)
+            review_likes = self._first(_LIKES_XPATH(review))
+            if review_likes is not None:
+                result["likes"] = int(review_likes.text_content())
         except Exception as e:
             self._handle_review_exception(result, review, "likes")
 
         # Parse review response
         try:
-            response = review.find(True, class_="d6SCIc")
-            if response:
+            response = self._find_class(review, "d6SCIc")
+            if response is not None:
                 result["response_text"] = self._parse_review_text(response)
-            response_date = review.find(True, class_="pi8uOe")
-            if response_date:
-                result["response_relative_date"] = response_date.text
+            response_date = self._find_class(review, "pi8uOe")
+            if response_date is not None:
+                result["response_relative_date"] = response_date.text_content()
         except Exception as e:
             self._handle_review_exception(result, review, "response")
 
         # Parse trip_type_travel_group
         try:
-            trip_type_travel_group = review.find(True, class_="PV7e7")
-            if trip_type_travel_group:
-                s = " ".join([s for s in trip_type_travel_group.stripped_strings])
-                result["trip_type_travel_group"] = re.sub("\s+", " ", s)
+            trip_type_travel_group = self._find_class(review, "PV7e7")
+            if trip_type_travel_group is not None:
+                result["trip_type_travel_group"] = self._join_text(
+                    trip_type_travel_group
+                )
         except Exception as e:
             self._handle_review_exception(result, review, "trip_type_travel_group")
 
         return result
 
+    def _get_reviews_page(
+        self,
+        query_base: str,
+        token: str,
+        url_name: str,
+        i: int,
+        delay: float = 0,
+    ) -> Tuple[List[html.HtmlElement], int, str]:
+        """Requests a page of reviews, retrying on errors.
+        Reviews are None if the page was skipped after exceeding retries"""
+        time.sleep(delay)
+        response_text = review_count = None
+        n = self.n_retries
+        while n > 0:
+            next_token = None
+            try:
+                (
+                    response_text,
+                    _,
+                    reviews,
+                    review_count,
+                    next_token,
+                ) = self._get_request(query_base, token=token)
+                assert isinstance(reviews, list)
+                return reviews, review_count, next_token
+            except Exception as e:
+                n -= 1
+                self._handle_place_exception(response_text, url_name, i)
+                if n == 0 and next_token is None:
+                    raise e
+                elif n == 0:
+                    return None, review_count, next_token
+                else:
+                    self.logger.info(f"waiting {self.retry_time} seconds")
+                    time.sleep(self.retry_time)
+
     def scrape_reviews(
         self,
         url: str,
@@ -378,82 +487,87 @@ class GoogleMapsAPIScraper:
         token: str = "",
     ):
         """Scrape specified amount of reviews of a place, appending results in csv"""
-        url_name = re.findall("(?<=place/).*?(?=/)", url)[0]
+        url_name = _PLACE_NAME_RE.search(url).group(1)
         url_name = urllib.parse.unquote_plus(url_name)
         self._reset_logger_filter(url_name)
         self.logger.info(f"Scraping reviews for url: {url_name}")
 
         feature_id = self._parse_url_to_feature_id(url)
         sort_by_id = self._parse_sort_by(sort_by)
+        query_base = self._get_query_base(feature_id, hl=hl, sort_by_id=sort_by_id)
 
         results = []
         j = 0
 
         n_requests = math.ceil((n_reviews) / 10)
-        for i in range(n_requests):
-            self.logger.info(f"Request: {i:>8}; review: {j:>8}")
-            n = self.n_retries
-            while n > 0:
-                next_token = None
+        if n_requests <= 0:
+            self.logger.info(f"No reviews to scrape. n_reviews: {n_reviews}")
+            return results
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(
+                self._get_reviews_page, query_base, token, url_name, 0
+            )
+            for i in range(n_requests):
+                self.logger.info(f"Request: {i:>8}; review: {j:>8}")
                 try:
-                    (
-                        response_text,
-                        response_soup,
-                        reviews_soup,
-                        review_count,
-                        next_token,
-                    ) = self._get_request(
-                        feature_id,
-                        hl=hl,
-                        sort_by_id=sort_by_id,
-                        token=token,
+                    reviews, review_count, next_token = future.result()
+                except Exception:
+                    self.logger.exception(
+                        f"Max retries exceeded. Ending. "
+                        f"Requests made: {i+1}; Reviews parsed: {j}"
                     )
-                    assert isinstance(reviews_soup, list)
-                    break
-                except Exception as e:
-                    n -= 1
-                    self._handle_place_exception(response_text, url_name, i)
-                    if n == 0 and next_token is None:
-                        self.logger.exception(
-                            f"Max retries exceeded. Ending. "
-                            f"Requests made: {i+1}; Reviews parsed: {j}"
-                        )
-                        raise e
-                    elif n == 0:
-                        self.logger.exception(
-                            f"Max retries exceeded. Skipping token: {token}. "
-                            f"Requests made: {i+1}; Reviews parsed: {j}"
-                        )
-                        break
-                    else:
-                        self.logger.info(f"waiting {self.retry_time} seconds")
-                        time.sleep(self.retry_time)
-            token = next_token
-            if n == 0:
-                continue
-
-            try:
-                for review in reviews_soup:
-                    # self.logger.info(f"Parsing review: {j:>8}")
-                    result = self._parse_review(review)
-                    result["token"] = token
-
-                    writer.writerow(result.values())
-                    file.flush()
+                    raise
+                if reviews is None:
+                    self.logger.error(
+                        f"Max retries exceeded. Skipping token: {token}. "
+                        f"Requests made: {i+1}; Reviews parsed: {j}"
+                    )
+                token = next_token
+                last_page = reviews is not None and (review_count < 10 or token == "")
+                enough_reviews = reviews is not None and j + len(reviews) >= n_reviews
+
+                # Requesting next page while this one is parsed
+                if i + 1 < n_requests and not (last_page or enough_reviews):
+                    # Waiting so google wont block this scraper
+                    delay = 0 if reviews is None else self.request_interval
+                    future = executor.submit(
+                        self._get_reviews_page,
+                        query_base,
+                        token,
+                        url_name,
+                        i + 1,
+                        delay,
+                    )
+                if reviews is None:
+                    continue
 
-                    results.append(result)
-                    # self.logger.info(results)
-                    j += 1
-            except Exception as e:
-                tb = re.sub("\s", " ", traceback.format_exc())
-                self.logger.info(f"error parsing review: {j} request: {i} tb: {tb}")
+                retrieval_date = str(datetime.now())
 
-            if review_count < 10 or token == "":
-                self.logger.info(f"Place review limit at {j} reviews")
-                break
+                try:
+                    for review in reviews:
+                        if j >= n_reviews:
+                            break
+                        # self.logger.info(f"Parsing review: {j:>8}")
+                        result = self._parse_review(review, retrieval_date)
+                        result["token"] = token
+
+                        writer.writerow(result.values())
+
+                        results.append(result)
+                        # self.logger.info(results)
+                        j += 1
+                except Exception as e:
+                    tb = _WS1_RE.sub(" ", traceback.format_exc())
+                    self.logger.info(f"error parsing review: {j} request: {i} tb: {tb}")
+                # Flushing once per page instead of once per review
+                file.flush()
 
-            # Waiting so google wont block this scraper
-            time.sleep(self.request_interval)
+                if last_page:
+                    self.logger.info(f"Place review limit at {j} reviews")
+                    break
+                if enough_reviews:
+                    break
 
         self.logger.info(
             f"Done Scraping Reviews. Requests made: {i+1}; Reviews parsed: {j}"
@@ -470,7 +584,7 @@ class GoogleMapsAPIScraper:
         hl: str = "",
     ):
         """Scrape place metadata, writing to csv"""
-        url_name = re.findall("(?<=place/).*?(?=/)", url)[0]
+        url_name = _PLACE_NAME_RE.search(url).group(1)
         url_name = urllib.parse.unquote_plus(url_name)
         self._reset_logger_filter(url_name)
         self.logger.info(f"Scraping metadata for url: {url_name}")
@@ -478,11 +592,9 @@ class GoogleMapsAPIScraper:
         feature_id = self._parse_url_to_feature_id(url)
 
         self.logger.info(f"Parsing metadata...")
-        _, response_soup, _, _, _ = self._get_request(
-            feature_id,
-            hl=hl,
-        )
-        metadata = self._parse_place(response=response_soup)
+        query_base = self._get_query_base(feature_id, hl=hl)
+        _, tree, _, _, _ = self._get_request(query_base)
+        metadata = self._parse_place(tree=tree, retrieval_date=str(datetime.now()))
         metadata["feature_id"] = feature_id
         metadata["url"] = url
         metadata["name"] = name